@@ -2,12 +2,32 @@ import subprocess
 import json
 import re
 from pathlib import Path
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, List, Optional, Tuple
+from src.governor import run_ffmpeg
 
 
-def analyze_audio(input_path: Path) -> Dict[str, Any]:
+def window_args(start: Optional[float], length: Optional[float]) -> List[str]:
+    """
+    Аргументы ffmpeg для быстрого seek: ставятся перед -i,
+    чтобы декодировался только нужный фрагмент.
+    """
+    args = []
+    if start:
+        args += ["-ss", f"{start:g}"]
+    if length:
+        args += ["-t", f"{length:g}"]
+    return args
+
+
+def analyze_audio(
+    input_path: Path,
+    start: Optional[float] = None,
+    length: Optional[float] = None,
+) -> Dict[str, Any]:
     """
     Анализирует аудиодорожку видеофайла и возвращает параметры.
+
+    Если заданы start/length, анализируется только этот фрагмент.
     """
     try:
         # Получаем базовую информацию через ffprobe
@@ -43,10 +63,18 @@ def analyze_audio(input_path: Path) -> Dict[str, Any]:
         channels = 2
         duration = 30.0
 
+    if length:
+        # В режиме фрагмента длительность ограничена окном
+        remaining = max(duration - (start or 0.0), 0.0) if duration else length
+        duration = min(remaining, length)
+
+    window = window_args(start, length)
+
     # Анализ статистики с помощью astats
     stats_cmd = [
         "ffmpeg",
         "-hide_banner",
+        *window,
         "-i",
         str(input_path),
         "-af",
@@ -55,7 +83,7 @@ def analyze_audio(input_path: Path) -> Dict[str, Any]:
         "null",
         "-",
     ]
-    stats_result = subprocess.run(stats_cmd, capture_output=True, text=True)
+    stats_result = run_ffmpeg(stats_cmd, "analyze", capture_output=True, text=True)
 
     # Парсим RMS и пиковые значения
     rms_level = _parse_rms_from_output(stats_result.stderr)
@@ -65,6 +93,7 @@ def analyze_audio(input_path: Path) -> Dict[str, Any]:
     volume_cmd = [
         "ffmpeg",
         "-hide_banner",
+        *window,
         "-i",
         str(input_path),
         "-af",
@@ -73,7 +102,7 @@ def analyze_audio(input_path: Path) -> Dict[str, Any]:
         "null",
         "-",
     ]
-    volume_result = subprocess.run(volume_cmd, capture_output=True, text=True)
+    volume_result = run_ffmpeg(volume_cmd, "analyze", capture_output=True, text=True)
     mean_volume = _parse_mean_volume(volume_result.stderr)
 
     # Детект клиппинга
@@ -173,6 +202,7 @@ def suggest_filter_config(analysis):
         afftdn = {"nr": 6, "nf": -60, "rf": -70}
 
     return {
+        "profile": "auto",
         "audio_codec": "aac",
         "audio_bitrate": "192k",
         "audio_filters": [
@@ -242,25 +272,27 @@ def suggest_filter_config(analysis):
     }
 
 
+def get_duration(path: Path) -> float:
+    """Длительность контейнера в секундах (ffprobe format=duration)."""
+    cmd = [
+        "ffprobe",
+        "-v",
+        "error",
+        "-show_entries",
+        "format=duration",
+        "-of",
+        "default=noprint_wrappers=1:nokey=1",
+        str(path),
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip())
+
+
 def validate_output(input_path: Path, output_path: Path) -> Tuple[bool, str]:
     """
     Проверяет корректность выходного файла.
     """
 
-    def get_duration(path):
-        cmd = [
-            "ffprobe",
-            "-v",
-            "error",
-            "-show_entries",
-            "format=duration",
-            "-of",
-            "default=noprint_wrappers=1:nokey=1",
-            str(path),
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        return float(result.stdout.strip())
-
     try:
         input_duration = get_duration(input_path)
         output_duration = get_duration(output_path)
@@ -284,7 +316,9 @@ def validate_output(input_path: Path, output_path: Path) -> Tuple[bool, str]:
             "null",
             "-",
         ]
-        stats_result = subprocess.run(stats_cmd, capture_output=True, text=True)
+        stats_result = run_ffmpeg(
+            stats_cmd, "validate", capture_output=True, text=True
+        )
         peak = _parse_peak_from_output(stats_result.stderr)
 
         if peak and peak > -0.5:
@@ -4,6 +4,36 @@ from pathlib import Path
 CONFIG_FILE = Path("config/filters.json")
 INPUT_DIR = Path("data/fixtures")
 OUTPUT_DIR = Path("data/output")
+TIMINGS_FILE = Path("data/timings.json")
+
+
+def positive_int(value: str) -> int:
+    """Целое число >= 1 для --jobs/--host-jobs."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got {value!r}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got {value!r}")
+    return number
+
+
+def parse_preview_window(value: str) -> tuple[float, float]:
+    """
+    Разбирает окно предпросмотра вида START:DURATION (в секундах).
+    """
+    try:
+        start_str, length_str = value.split(":")
+        start, length = float(start_str), float(length_str)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"expected START:DURATION in seconds, got {value!r}"
+        )
+    if start < 0 or length <= 0:
+        raise argparse.ArgumentTypeError(
+            f"START must be >= 0 and DURATION > 0, got {value!r}"
+        )
+    return start, length
 
 
 def parse_args() -> argparse.Namespace:
@@ -26,7 +56,40 @@ def parse_args() -> argparse.Namespace:
         default=None,
         help="Path to filters config (JSON); ignored in 'auto' mode",
     )
-    return p.parse_args()
+    p.add_argument(
+        "--preview",
+        type=parse_preview_window,
+        default=None,
+        metavar="START:DURATION",
+        help="Process only this excerpt (seconds) into an audio-only WAV preview",
+    )
+    p.add_argument(
+        "--compare",
+        action="store_true",
+        help="With --preview: write the original excerpt followed by the processed one",
+    )
+    p.add_argument(
+        "--plan",
+        action="store_true",
+        help="Dry run: estimate processing time per file and for the whole batch",
+    )
+    p.add_argument(
+        "--jobs",
+        type=positive_int,
+        default=1,
+        help="Number of files processed in parallel; also used by --plan (default: 1)",
+    )
+    p.add_argument(
+        "--host-jobs",
+        type=positive_int,
+        default=None,
+        help="Host-wide limit of concurrent ffmpeg processes shared by all "
+        "invocations (default: CPUs / 2)",
+    )
+    args = p.parse_args()
+    if args.compare and not args.preview:
+        p.error("--compare requires --preview")
+    return args
 
 
 def resolve_paths(args: argparse.Namespace) -> tuple[Path, Path, Path]:
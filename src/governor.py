@@ -0,0 +1,300 @@
+import fcntl
+import math
+import os
+import shutil
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+
+# Каталог слотов общий для всех запусков утилиты на хосте
+LOCK_DIR = Path(os.environ.get("VOICE_CLEANER_LOCK_DIR", "/tmp/voice_cleaner"))
+
+# Оценка памяти на один процесс ffmpeg (loudnorm/afftdn + буферы)
+JOB_MEMORY_MB = 512
+
+POLL_INTERVAL = 0.5
+
+# Приоритеты по роли: (nice, уровень ionice в классе best-effort).
+# Анализ и валидация уступают кодированию, которое даёт результат.
+PRIORITIES = {
+    "analyze": (10, 7),
+    "validate": (10, 7),
+    "encode": (5, 4),
+}
+
+
+class CpuUsage:
+    """Накопленное CPU-время (user + sys) дочерних процессов, в секундах."""
+
+    def __init__(self):
+        self.seconds = 0.0
+
+
+_usage = threading.local()
+
+
+@contextmanager
+def cpu_usage():
+    """
+    Суммирует CPU-время процессов, запущенных через run_ffmpeg
+    в текущем потоке внутри блока. Ожидание слота сюда не входит.
+    """
+    usage = CpuUsage()
+    outer = getattr(_usage, "current", None)
+    _usage.current = usage
+    try:
+        yield usage
+    finally:
+        _usage.current = outer
+        if outer is not None:
+            outer.seconds += usage.seconds
+
+
+def _run_child(
+    cmd: List[str],
+    check: bool = False,
+    capture_output: bool = False,
+    text: bool = False,
+) -> subprocess.CompletedProcess:
+    """
+    Аналог subprocess.run, который забирает процесс через os.wait4,
+    чтобы получить его собственный rusage и учесть его в cpu_usage.
+    """
+    pipe = subprocess.PIPE if capture_output else None
+    proc = subprocess.Popen(cmd, stdout=pipe, stderr=pipe, text=text)
+    stdout = stderr = None
+    try:
+        if capture_output:
+            # stderr читается отдельно, чтобы не заблокироваться на полном буфере
+            chunks = []
+            reader = threading.Thread(target=lambda: chunks.append(proc.stderr.read()))
+            reader.start()
+            stdout = proc.stdout.read()
+            reader.join()
+            stderr = chunks[0]
+            proc.stdout.close()
+            proc.stderr.close()
+        _, status, rusage = os.wait4(proc.pid, 0)
+    except BaseException:
+        proc.kill()
+        proc.wait()
+        raise
+    proc.returncode = os.waitstatus_to_exitcode(status)
+
+    usage = getattr(_usage, "current", None)
+    if usage is not None:
+        usage.seconds += rusage.ru_utime + rusage.ru_stime
+
+    if check and proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, stdout, stderr)
+    return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+
+
+def _cgroup_cpu_limit(cgroup_root: str) -> Optional[float]:
+    """Лимит CPU из квоты cgroup (v2 cpu.max или v1 cfs_quota), если задан."""
+    root = Path(cgroup_root)
+    try:
+        quota, period = (root / "cpu.max").read_text().split()
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        quota = int((root / "cpu" / "cpu.cfs_quota_us").read_text())
+        period = int((root / "cpu" / "cpu.cfs_period_us").read_text())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def available_cpus(cgroup_root: str = "/sys/fs/cgroup") -> int:
+    """
+    Число CPU, доступных процессу: учитывает affinity и квоту cgroup
+    (например, docker --cpus), а не только число ядер хоста.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        cpus = os.cpu_count() or 1
+    limit = _cgroup_cpu_limit(cgroup_root)
+    if limit is not None:
+        cpus = min(cpus, math.ceil(limit))
+    return max(1, cpus)
+
+
+def read_cpu_load(path: str = "/proc/loadavg") -> float:
+    """
+    Загрузка CPU: минимум из load average за минуту и числа выполняющихся
+    сейчас задач (без самого читающего процесса).
+
+    Load average запаздывает: после завершения задачи её нагрузка держится
+    в нём ещё минуту. Мгновенный счётчик шумит. Минимум отбрасывает и
+    запаздывающий хвост, и кратковременные всплески.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            fields = f.read().split()
+        load1 = float(fields[0])
+        running = int(fields[3].split("/")[0]) - 1
+        return max(0.0, min(load1, running))
+    except (OSError, ValueError, IndexError):
+        return os.getloadavg()[0]
+
+
+def read_mem_available_mb() -> Optional[float]:
+    """MemAvailable из /proc/meminfo в мегабайтах (None, если недоступно)."""
+    try:
+        with open("/proc/meminfo", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class Governor:
+    """
+    Распределяет ресурсы хоста между процессами ffmpeg.
+
+    Бюджет — max_jobs слотов-файлов в lock_dir, захватываемых через flock,
+    поэтому его делят все запуски утилиты (и потоки внутри одного запуска).
+    Слот освобождается ядром, даже если процесс упал. Сколько слотов можно
+    занять прямо сейчас, решает allowed_jobs по загрузке CPU и свободной
+    памяти; каждому процессу выдаются -threads/-filter_threads и nice/ionice.
+    """
+
+    def __init__(
+        self,
+        max_jobs: Optional[int] = None,
+        lock_dir: Path = LOCK_DIR,
+        cpus: Optional[int] = None,
+        job_memory_mb: float = JOB_MEMORY_MB,
+        load_reader: Callable[[], float] = read_cpu_load,
+        mem_reader: Callable[[], Optional[float]] = read_mem_available_mb,
+        poll_interval: float = POLL_INTERVAL,
+    ):
+        if max_jobs is not None and max_jobs < 1:
+            raise ValueError(f"max_jobs must be >= 1, got {max_jobs}")
+        self.cpus = cpus or available_cpus()
+        self.max_jobs = max_jobs or max(1, self.cpus // 2)
+        self.threads = max(1, self.cpus // self.max_jobs)
+        self.lock_dir = Path(lock_dir)
+        self.job_memory_mb = job_memory_mb
+        self.load_reader = load_reader
+        self.mem_reader = mem_reader
+        self.poll_interval = poll_interval
+
+    def allowed_jobs(self, busy: int) -> int:
+        """
+        Сколько слотов может быть занято при busy уже занятых.
+
+        Нагрузка от наших же процессов (busy * threads) вычитается из
+        read_cpu_load, чтобы не душить самих себя; остаток считается чужим.
+        Число слотов округляется: чужая нагрузка до threads / 2 CPU
+        не отнимает целый слот.
+        """
+        external = max(0.0, self.load_reader() - busy * self.threads)
+        by_cpu = int((self.cpus - external) / self.threads + 0.5)
+        allowed = min(self.max_jobs, by_cpu)
+
+        mem_available = self.mem_reader()
+        if mem_available is not None:
+            allowed = min(allowed, busy + int(mem_available // self.job_memory_mb))
+
+        # Хотя бы один процесс на хосте должен выполняться всегда
+        return max(1, allowed)
+
+    def _try_acquire(self) -> Optional[int]:
+        """Захватывает свободный слот, если это разрешено; возвращает fd."""
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        held = None
+        busy = 0
+        for i in range(self.max_jobs):
+            fd = os.open(self.lock_dir / f"slot-{i}.lock", os.O_RDWR | os.O_CREAT)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                busy += 1
+                os.close(fd)
+                continue
+            if held is None:
+                held = fd
+            else:
+                # Свободный слот нужен только для подсчёта
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+
+        if held is not None and busy >= self.allowed_jobs(busy):
+            fcntl.flock(held, fcntl.LOCK_UN)
+            os.close(held)
+            held = None
+        return held
+
+    @contextmanager
+    def slot(self):
+        """Блокирует до получения слота и держит его до выхода из блока."""
+        fd = self._try_acquire()
+        while fd is None:
+            time.sleep(self.poll_interval)
+            fd = self._try_acquire()
+        try:
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def command(self, cmd: List[str], role: str) -> List[str]:
+        """
+        Добавляет к команде лимиты потоков (для ffmpeg) и приоритеты роли.
+        """
+        cmd = list(cmd)
+        if Path(cmd[0]).name == "ffmpeg":
+            threads = str(self.threads)
+            # -filter_threads — глобальная опция, -threads перед выходом — энкодер
+            global_opts = ["-filter_threads", threads]
+            if "-filter_complex" in cmd:
+                # -filter_threads на графы -filter_complex не действует
+                global_opts += ["-filter_complex_threads", threads]
+            cmd[1:1] = global_opts
+            cmd[-1:-1] = ["-threads", threads]
+
+        nice, io_level = PRIORITIES[role]
+        prefix = []
+        if shutil.which("ionice"):
+            prefix += ["ionice", "-t", "-c", "2", "-n", str(io_level)]
+        if shutil.which("nice"):
+            prefix += ["nice", "-n", str(nice)]
+        return prefix + cmd
+
+    def run(
+        self, cmd: List[str], role: str, **kwargs: Any
+    ) -> subprocess.CompletedProcess:
+        """Запуск команды под слотом governor'а."""
+        with self.slot():
+            return _run_child(self.command(cmd, role), **kwargs)
+
+
+_governor: Optional[Governor] = None
+
+
+def configure(**kwargs: Any) -> Governor:
+    """Включает governor для всех последующих вызовов run_ffmpeg."""
+    global _governor
+    _governor = Governor(**kwargs)
+    return _governor
+
+
+def run_ffmpeg(cmd: List[str], role: str, **kwargs: Any) -> subprocess.CompletedProcess:
+    """
+    Запускает ffmpeg через governor, если он настроен, иначе напрямую.
+    """
+    if _governor is None:
+        return _run_child(cmd, **kwargs)
+    return _governor.run(cmd, role, **kwargs)
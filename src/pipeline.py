@@ -1,8 +1,21 @@
 import subprocess
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 from src.filters import build_filter_chain_string
-from src.analyze import analyze_audio, suggest_filter_config, validate_output
+from src.governor import cpu_usage, run_ffmpeg
+from src.analyze import (
+    analyze_audio,
+    suggest_filter_config,
+    get_duration,
+    validate_output,
+    window_args,
+)
+
+# loudnorm отдаёт 192 kHz; предпросмотр приводится к частоте обычного выхода
+PREVIEW_RESAMPLE = "aresample=48000"
+
+# Формат, к которому приводятся оба фрагмента перед склейкой "до/после"
+PREVIEW_FORMAT = f"{PREVIEW_RESAMPLE},aformat=sample_fmts=fltp:channel_layouts=stereo"
 
 
 def _get_fallback_config() -> Dict[str, Any]:
@@ -10,6 +23,7 @@ def _get_fallback_config() -> Dict[str, Any]:
     Возвращает агрессивную конфигурацию для удаления музыки.
     """
     return {
+        "profile": "fallback",
         "audio_codec": "aac",
         "audio_bitrate": "256k",
         "audio_filters": [
@@ -57,17 +71,18 @@ def _get_fallback_config() -> Dict[str, Any]:
     }
 
 
-def process_file(
+def resolve_config(
     input_path: Path,
-    output_path: Path,
     cfg: Dict[str, Any],
-    overwrite: bool = True,
-) -> None:
+    start: Optional[float] = None,
+    length: Optional[float] = None,
+) -> Dict[str, Any]:
     """
-    Обрабатывает видеофайл с автоматическим анализом или ручной конфигурацией.
+    Возвращает итоговую конфигурацию для файла.
 
-    Если в cfg указан "auto_analyze": true, то анализирует файл и генерирует
-    оптимальные параметры. Иначе использует параметры из cfg.
+    Если в cfg указан "auto_analyze": true, то анализирует файл (или фрагмент
+    start/length) и генерирует оптимальные параметры. Иначе использует cfg.
+    Пустая цепочка фильтров заменяется fallback-конфигурацией.
     """
 
     # Проверяем, нужен ли автоанализ
@@ -79,7 +94,7 @@ def process_file(
         print("=" * 60)
 
         try:
-            analysis = analyze_audio(input_path)
+            analysis = analyze_audio(input_path, start, length)
 
             print(f"  Частота дискретизации: {analysis['sample_rate']} Hz")
             print(f"  Каналы: {analysis['channels']}")
@@ -102,15 +117,64 @@ def process_file(
             # Генерируем безопасную конфигурацию
             cfg = _get_fallback_config()
 
-    # Строим цепочку фильтров
-    filters_cfg = cfg.get("audio_filters", [])
-
     # ВАЖНО: если фильтры пустые, используем fallback
-    if not filters_cfg:
+    if not cfg.get("audio_filters"):
         print(f"  ⚠ Нет фильтров в конфигурации, использую fallback")
         cfg = _get_fallback_config()
-        filters_cfg = cfg.get("audio_filters", [])
 
+    return cfg
+
+
+def planned_config(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Конфигурация, которую получит файл, без запуска анализа (для --plan).
+
+    Состав цепочки suggest_filter_config не зависит от уровня шума —
+    меняются только параметры afftdn, поэтому анализ можно не выполнять.
+    """
+    if cfg.get("auto_analyze", False):
+        cfg = suggest_filter_config({"noise_level": "medium"})
+    if not cfg.get("audio_filters"):
+        cfg = _get_fallback_config()
+    return cfg
+
+
+def profile_name(cfg: Dict[str, Any]) -> str:
+    """Имя профиля итоговой конфигурации (ключ таблицы RTF)."""
+    return cfg.get("profile", "manual")
+
+
+def filter_names(cfg: Dict[str, Any]) -> List[str]:
+    """Имена фильтров цепочки в порядке применения."""
+    return [flt["name"] for flt in cfg.get("audio_filters", []) if flt.get("name")]
+
+
+def process_file(
+    input_path: Path,
+    output_path: Path,
+    cfg: Dict[str, Any],
+    overwrite: bool = True,
+    progress: bool = True,
+) -> Dict[str, Any]:
+    """
+    Обрабатывает видеофайл с автоматическим анализом или ручной конфигурацией.
+
+    Конфигурация выбирается через resolve_config. Возвращает данные о задаче
+    для таблицы RTF: профиль, фильтры, длительность и CPU-время каждой
+    стадии (user + sys процессов ffmpeg). progress=False отключает строку
+    прогресса ffmpeg (-stats), например при параллельной обработке.
+    """
+
+    stages = {}
+    auto_analyze = cfg.get("auto_analyze", False)
+
+    with cpu_usage() as usage:
+        cfg = resolve_config(input_path, cfg)
+    if auto_analyze:
+        stages["analyze"] = usage.seconds
+
+    # Строим цепочку фильтров
+    filters_cfg = cfg.get("audio_filters", [])
     af_chain = build_filter_chain_string(filters_cfg)
 
     acodec = cfg.get("audio_codec", "aac")
@@ -129,7 +193,7 @@ def process_file(
         "-hide_banner",
         "-loglevel",
         "warning",
-        "-stats",
+        *(["-stats"] if progress else []),
         "-i",
         str(input_path),
         "-c:v",
@@ -148,7 +212,9 @@ def process_file(
     cmd.append(str(output_path))
 
     try:
-        subprocess.run(cmd, check=True)
+        with cpu_usage() as usage:
+            run_ffmpeg(cmd, "encode", check=True)
+        stages["encode"] = usage.seconds
         print(f"\n✓ Обработка завершена")
 
         # Валидация результата
@@ -156,7 +222,9 @@ def process_file(
         print("Валидация результата")
         print("=" * 60)
 
-        valid, message = validate_output(input_path, output_path)
+        with cpu_usage() as usage:
+            valid, message = validate_output(input_path, output_path)
+        stages["validate"] = usage.seconds
 
         if valid:
             print(f"  ✓ {message}")
@@ -166,3 +234,80 @@ def process_file(
     except subprocess.CalledProcessError as e:
         print(f"\n✗ ОШИБКА при обработке {input_path.name}")
         raise
+
+    try:
+        duration = get_duration(input_path)
+    except Exception:
+        duration = 0.0
+
+    return {
+        "profile": profile_name(cfg),
+        "filters": filter_names(cfg),
+        "duration": duration,
+        "stages": stages,
+    }
+
+
+def preview_file(
+    input_path: Path,
+    output_path: Path,
+    cfg: Dict[str, Any],
+    start: float,
+    length: float,
+    compare: bool = False,
+    overwrite: bool = True,
+) -> None:
+    """
+    Быстрый предпросмотр: анализирует и обрабатывает только фрагмент
+    [start, start + length] и пишет его в аудиофайл без видео.
+
+    Ремукс видео и полная валидация пропускаются. При compare=True
+    в файл пишется исходный фрагмент, а сразу за ним — обработанный.
+    """
+
+    cfg = resolve_config(input_path, cfg, start, length)
+    af_chain = build_filter_chain_string(cfg.get("audio_filters", []))
+
+    print(f"\n{'=' * 60}")
+    print(f"Предпросмотр: {input_path.name} [{start:g}s +{length:g}s]")
+    print("=" * 60)
+    print(f"  Выходной файл: {output_path.name}")
+    print(f"  Режим: {'до/после' if compare else 'только результат'}")
+
+    cmd = [
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel",
+        "warning",
+        *window_args(start, length),
+        "-i",
+        str(input_path),
+        "-vn",
+    ]
+
+    if compare:
+        graph = (
+            f"[0:a]asplit=2[orig][proc];"
+            f"[orig]{PREVIEW_FORMAT}[before];"
+            f"[proc]{af_chain},{PREVIEW_FORMAT}[after];"
+            f"[before][after]concat=n=2:v=0:a=1[out]"
+        )
+        cmd += ["-filter_complex", graph, "-map", "[out]"]
+    else:
+        cmd += ["-af", f"{af_chain},{PREVIEW_RESAMPLE}"]
+
+    # PCM: без энкодера, чтобы не тратить время на сжатие
+    cmd += ["-c:a", "pcm_s16le"]
+
+    if overwrite:
+        cmd.append("-y")
+
+    cmd.append(str(output_path))
+
+    try:
+        run_ffmpeg(cmd, "encode", check=True)
+        print(f"\n✓ Предпросмотр готов")
+
+    except subprocess.CalledProcessError as e:
+        print(f"\n✗ ОШИБКА при предпросмотре {input_path.name}")
+        raise
@@ -0,0 +1,107 @@
+import heapq
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from src.analyze import get_duration
+from src.pipeline import filter_names, planned_config, profile_name
+from src.timings import estimate_job
+
+
+def build_plan(
+    inputs: List[Path],
+    cfg: Dict[str, Any],
+    table: Dict[str, Any],
+) -> List[Dict[str, Any]]:
+    """
+    Оценивает стоимость обработки каждого файла без запуска ffmpeg.
+
+    Длительность берётся через ffprobe, цепочка — через planned_config,
+    CPU-время стадий — по таблице RTF.
+    """
+    auto_analyze = cfg.get("auto_analyze", False)
+    plan = []
+    for path in inputs:
+        try:
+            duration = get_duration(path)
+        except Exception as e:
+            plan.append({"input": path, "error": str(e), "total": 0.0})
+            continue
+
+        file_cfg = planned_config(cfg)
+        profile = profile_name(file_cfg)
+        names = filter_names(file_cfg)
+        stages = estimate_job(table, names, duration, auto_analyze)
+        plan.append(
+            {
+                "input": path,
+                "duration": duration,
+                "profile": profile,
+                "filters": names,
+                "stages": stages,
+                "total": sum(stages.values()),
+            }
+        )
+    return plan
+
+
+def schedule(plan: List[Dict[str, Any]], jobs: int) -> Tuple[float, List[List[Path]]]:
+    """
+    Раскладывает файлы по jobs воркерам (самые долгие — первыми) и
+    возвращает время завершения всей пачки и очередь каждого воркера.
+    """
+    jobs = max(1, jobs)
+    workers = [(0.0, i) for i in range(jobs)]
+    queues: List[List[Path]] = [[] for _ in range(jobs)]
+    for entry in sorted(plan, key=lambda e: e["total"], reverse=True):
+        load, i = heapq.heappop(workers)
+        queues[i].append(entry["input"])
+        heapq.heappush(workers, (load + entry["total"], i))
+    makespan = max(load for load, _ in workers)
+    return makespan, queues
+
+
+def print_plan(
+    plan: List[Dict[str, Any]], jobs: int, host_jobs: int, top: int = 5
+) -> None:
+    """
+    Печатает итог, критический путь и самые долгие файлы.
+
+    Одновременно выполняется не больше min(jobs, host_jobs) файлов:
+    --jobs ограничен бюджетом governor'а, а стадии одного файла идут
+    последовательно.
+    """
+    ok = [e for e in plan if "error" not in e]
+    total = sum(e["total"] for e in ok)
+    media = sum(e["duration"] for e in ok)
+    workers = max(1, min(jobs, host_jobs))
+    makespan, queues = schedule(ok, workers)
+    totals = {e["input"]: e["total"] for e in ok}
+
+    print(f"\n{'=' * 60}")
+    print("План обработки (dry run)")
+    print("=" * 60)
+    print(f"  Файлов: {len(ok)}, длительность: {media:.1f} сек")
+    print(f"  Суммарное время обработки: {total:.1f} CPU-сек")
+    print(
+        f"  Критический путь при {workers} параллельных файлах "
+        f"(--jobs {jobs}, --host-jobs {host_jobs}): {makespan:.1f} CPU-сек"
+    )
+
+    busiest = max(queues, key=lambda q: sum(totals[p] for p in q), default=[])
+    if busiest:
+        print(f"  Очередь критического пути: {', '.join(p.name for p in busiest)}")
+
+    print("\n  Самые долгие файлы:")
+    for e in sorted(ok, key=lambda e: e["total"], reverse=True)[:top]:
+        stages = ", ".join(f"{k}={v:.1f}s" for k, v in sorted(e["stages"].items()))
+        print(
+            f"    {e['input'].name}: {e['total']:.1f} CPU-сек "
+            f"({e['duration']:.1f} сек аудио, профиль {e['profile']}; {stages})"
+        )
+
+    for e in plan:
+        if "error" in e:
+            print(
+                f"  ⚠ {e['input'].name}: не удалось получить длительность "
+                f"({e['error']})"
+            )
@@ -0,0 +1,190 @@
+import fcntl
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List
+
+# Realtime factor (RTF) = CPU-секунд (user + sys ffmpeg) на секунду аудио.
+# Стартовые значения грубые; таблица уточняется по завершённым задачам.
+DEFAULT_STAGE_RTF = {
+    "analyze": 0.02,  # два прохода декодирования (astats + volumedetect)
+    "encode": 0.01,  # декодирование, AAC и копирование видео без фильтров
+    "validate": 0.01,  # ffprobe + astats по выходному файлу
+}
+
+DEFAULT_FILTER_RTF = {
+    "afftdn": 0.02,
+    "loudnorm": 0.006,
+    "acompressor": 0.002,
+    "agate": 0.002,
+    "alimiter": 0.002,
+    "equalizer": 0.001,
+    "highpass": 0.001,
+    "lowpass": 0.001,
+    "pan": 0.0005,
+}
+
+# RTF для фильтров, которых ещё нет в таблице
+UNKNOWN_FILTER_RTF = 0.003
+
+# Вес нового измерения в скользящем среднем
+LEARNING_RATE = 0.3
+
+# Пределы поправки RTF фильтров за одну задачу
+MIN_SCALE = 0.5
+MAX_SCALE = 2.0
+
+
+def _positive(value: Any) -> bool:
+    return isinstance(value, (int, float)) and value > 0
+
+
+def load_timings(path: Path) -> Dict[str, Any]:
+    """
+    Загружает таблицу RTF; отсутствующие значения берутся по умолчанию.
+
+    Нечитаемый файл и некорректные (не положительные) значения
+    игнорируются: таблица только уточняет оценки и не должна ломать запуск.
+    """
+    table = {
+        "stages": dict(DEFAULT_STAGE_RTF),
+        "filters": dict(DEFAULT_FILTER_RTF),
+        "profiles": {},
+    }
+    path = Path(path)
+    if not path.exists():
+        return table
+
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            saved = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"  ⚠ Таблица {path} не прочитана, использую значения по умолчанию: {e}")
+        return table
+    if not isinstance(saved, dict):
+        return table
+
+    for key in ("stages", "filters"):
+        section = saved.get(key)
+        if isinstance(section, dict):
+            table[key].update({k: v for k, v in section.items() if _positive(v)})
+
+    profiles = saved.get("profiles")
+    if isinstance(profiles, dict):
+        for key, entry in profiles.items():
+            if isinstance(entry, dict) and _positive(entry.get("encode")):
+                table["profiles"][key] = entry
+    return table
+
+
+def save_timings(path: Path, table: Dict[str, Any]) -> None:
+    """Атомарно сохраняет таблицу (через временный файл)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(table, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def chain_rtf(table: Dict[str, Any], filter_names: List[str]) -> float:
+    """RTF кодирования, собранный из базовой стоимости и фильтров цепочки."""
+    filters = table["filters"]
+    return table["stages"]["encode"] + sum(
+        filters.get(name, UNKNOWN_FILTER_RTF) for name in filter_names
+    )
+
+
+def chain_key(filter_names: List[str]) -> str:
+    """Сигнатура цепочки: имена фильтров по порядку."""
+    return ",".join(filter_names)
+
+
+def estimate_job(
+    table: Dict[str, Any],
+    filter_names: List[str],
+    duration: float,
+    auto_analyze: bool,
+) -> Dict[str, float]:
+    """
+    Оценивает CPU-время каждой стадии обработки файла в секундах.
+
+    Для цепочки с накопленной статистикой используется её собственный RTF,
+    иначе — сумма RTF фильтров цепочки.
+    """
+    stages = table["stages"]
+    learned = table["profiles"].get(chain_key(filter_names))
+
+    if learned and learned.get("samples"):
+        encode_rtf = learned["encode"]
+    else:
+        encode_rtf = chain_rtf(table, filter_names)
+
+    estimate = {
+        "encode": encode_rtf * duration,
+        "validate": stages["validate"] * duration,
+    }
+    if auto_analyze:
+        estimate["analyze"] = stages["analyze"] * duration
+    return estimate
+
+
+def _blend(old: float, new: float) -> float:
+    return (1 - LEARNING_RATE) * old + LEARNING_RATE * new
+
+
+def update_timings(table: Dict[str, Any], job: Dict[str, Any]) -> None:
+    """
+    Обновляет таблицу по данным завершённой задачи.
+
+    job: {"profile", "filters", "duration", "stages": {стадия: CPU-секунды}}.
+    Цепочка (по сигнатуре chain_key) получает измеренный RTF напрямую;
+    RTF фильтров масштабируются на отношение измеренного времени
+    кодирования к предсказанному.
+    """
+    duration = job.get("duration") or 0.0
+    if duration <= 0:
+        return
+
+    measured = {name: sec / duration for name, sec in job["stages"].items()}
+
+    for stage in ("analyze", "validate"):
+        if measured.get(stage, 0) > 0:
+            table["stages"][stage] = _blend(table["stages"][stage], measured[stage])
+
+    # Нулевое время кодирования — сбой измерения, а не бесплатная цепочка
+    encode_rtf = measured.get("encode", 0)
+    if encode_rtf <= 0:
+        return
+
+    learned = table["profiles"].setdefault(
+        chain_key(job["filters"]),
+        {"profile": job["profile"], "encode": encode_rtf, "samples": 0},
+    )
+    learned["encode"] = _blend(learned["encode"], encode_rtf)
+    learned["samples"] += 1
+
+    predicted = chain_rtf(table, job["filters"])
+    if predicted <= 0:
+        return
+    scale = (encode_rtf / predicted) ** LEARNING_RATE
+    scale = min(MAX_SCALE, max(MIN_SCALE, scale))
+    table["stages"]["encode"] *= scale
+    for name in set(job["filters"]):
+        old = table["filters"].get(name, UNKNOWN_FILTER_RTF)
+        table["filters"][name] = old * scale
+
+
+def record_job(path: Path, job: Dict[str, Any]) -> None:
+    """
+    Перечитывает таблицу, учитывает задачу и сохраняет обратно.
+
+    Под flock, чтобы параллельные задачи и запуски не теряли обновления.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_name(f".{path.name}.lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        table = load_timings(path)
+        update_timings(table, job)
+        save_timings(path, table)
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Модули лежат в src/ и импортируются как src.*, как из voice_cleaner.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,257 @@
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from src.governor import Governor, available_cpus, cpu_usage, read_cpu_load
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def make_governor(lock_dir, load=0.0, mem=None, **kwargs):
+    return Governor(
+        lock_dir=lock_dir,
+        load_reader=lambda: load,
+        mem_reader=lambda: mem,
+        poll_interval=0.02,
+        **kwargs,
+    )
+
+
+def max_overlap(log_path):
+    """Максимальное число одновременно работавших задач по журналу start/end."""
+    events = []
+    for line in log_path.read_text().splitlines():
+        kind, stamp = line.split()
+        # При равных отметках конец считается раньше начала
+        events.append((float(stamp), 0 if kind == "end" else 1))
+    running = peak = 0
+    for _, is_start in sorted(events):
+        running += 1 if is_start else -1
+        peak = max(peak, running)
+    return peak
+
+
+def test_slot_cap_holds_across_processes(tmp_path):
+    log = tmp_path / "jobs.log"
+    job = tmp_path / "job.py"
+    job.write_text(
+        textwrap.dedent(
+            f"""
+            import time
+            with open({str(log)!r}, "a") as f:
+                f.write(f"start {{time.time()}}\\n")
+            time.sleep(0.3)
+            with open({str(log)!r}, "a") as f:
+                f.write(f"end {{time.time()}}\\n")
+            """
+        )
+    )
+    driver = textwrap.dedent(
+        f"""
+        import sys
+        from concurrent.futures import ThreadPoolExecutor
+        sys.path.insert(0, {str(ROOT)!r})
+        from src.governor import Governor
+        g = Governor(
+            max_jobs=2,
+            lock_dir={str(tmp_path / "slots")!r},
+            cpus=4,
+            load_reader=lambda: 0.0,
+            mem_reader=lambda: None,
+            poll_interval=0.02,
+        )
+        cmd = [sys.executable, {str(job)!r}]
+        with ThreadPoolExecutor(3) as pool:
+            list(pool.map(lambda _: g.run(cmd, "encode", check=True), range(3)))
+        """
+    )
+
+    drivers = [subprocess.Popen([sys.executable, "-c", driver]) for _ in range(2)]
+    assert [d.wait(timeout=30) for d in drivers] == [0, 0]
+
+    assert log.read_text().count("start") == 6
+    assert max_overlap(log) == 2
+
+
+def test_allowed_jobs_idle_host(tmp_path):
+    g = make_governor(tmp_path, max_jobs=4, cpus=8)
+    assert g.threads == 2
+    assert g.allowed_jobs(0) == 4
+
+
+def test_allowed_jobs_subtracts_own_load(tmp_path):
+    # load 4 целиком создают наши 2 задачи по 2 потока
+    g = make_governor(tmp_path, load=4.0, max_jobs=4, cpus=8)
+    assert g.allowed_jobs(2) == 4
+
+
+def test_allowed_jobs_backs_off_on_external_load(tmp_path):
+    # Чужая нагрузка 11 - 2*2 = 7 оставляет 1 CPU, то есть полслота
+    g = make_governor(tmp_path, load=11.0, max_jobs=4, cpus=8)
+    assert g.allowed_jobs(2) == 1
+
+
+def test_small_background_load_keeps_default_budget(tmp_path):
+    # 4 CPU, по умолчанию 2 слота по 2 потока; фон 0.2 + одна наша задача
+    g = make_governor(tmp_path, load=2.2, cpus=4)
+    assert g.max_jobs == 2
+    assert g.allowed_jobs(1) == 2
+
+
+def test_small_background_load_keeps_last_slot(tmp_path):
+    # 8 CPU, 4 слота: фон 0.3 при трёх наших задачах не блокирует четвёртую
+    g = make_governor(tmp_path, load=6.3, max_jobs=4, cpus=8)
+    assert g.allowed_jobs(3) == 4
+
+
+def test_background_load_above_half_slot_takes_a_slot(tmp_path):
+    g = make_governor(tmp_path, load=2.0 + 1.5, cpus=4)
+    assert g.allowed_jobs(1) == 1
+
+
+def write_loadavg(tmp_path, content):
+    path = tmp_path / "loadavg"
+    path.write_text(content)
+    return str(path)
+
+
+def test_cpu_load_ignores_stale_average(tmp_path):
+    # Сразу после завершения задачи: среднее ещё 4.0, выполняются 2 потока
+    # (третий runnable — сам читающий процесс)
+    path = write_loadavg(tmp_path, "4.00 3.50 2.00 3/200 12345\n")
+    assert read_cpu_load(path) == 2.0
+
+    # Освободившийся слот снова доступен: 2 потока — это наша оставшаяся задача
+    g = make_governor(tmp_path, cpus=4)
+    g.load_reader = lambda: read_cpu_load(path)
+    assert g.allowed_jobs(1) == 2
+
+
+def test_cpu_load_ignores_momentary_spike(tmp_path):
+    path = write_loadavg(tmp_path, "0.50 0.40 0.30 9/200 12345\n")
+    assert read_cpu_load(path) == 0.5
+
+
+def test_cpu_load_falls_back_to_loadavg(tmp_path):
+    assert read_cpu_load(str(tmp_path / "missing")) >= 0.0
+
+
+def test_allowed_jobs_limited_by_memory(tmp_path):
+    g = make_governor(tmp_path, mem=1024.0, max_jobs=4, cpus=8, job_memory_mb=512)
+    assert g.allowed_jobs(1) == 3
+
+
+def test_allowed_jobs_never_below_one(tmp_path):
+    g = make_governor(tmp_path, load=100.0, mem=0.0, max_jobs=4, cpus=8)
+    assert g.allowed_jobs(0) == 1
+
+
+def test_try_acquire_respects_load(tmp_path):
+    g = make_governor(tmp_path, load=9.0, max_jobs=4, cpus=8)
+    with g.slot():
+        # Один слот занят, а нагрузка разрешает только одну задачу
+        assert g._try_acquire() is None
+
+
+def test_rejects_non_positive_max_jobs(tmp_path):
+    with pytest.raises(ValueError):
+        Governor(max_jobs=0, lock_dir=tmp_path)
+
+
+def test_command_adds_thread_limits(tmp_path):
+    g = make_governor(tmp_path, max_jobs=2, cpus=8)
+    cmd = g.command(["ffmpeg", "-i", "in.mp4", "-f", "null", "-"], "analyze")
+    ffmpeg = cmd[cmd.index("ffmpeg") :]
+    assert ffmpeg[:3] == ["ffmpeg", "-filter_threads", "4"]
+    assert ffmpeg[-3:] == ["-threads", "4", "-"]
+
+
+def test_command_limits_filter_complex_threads(tmp_path):
+    g = make_governor(tmp_path, max_jobs=2, cpus=8)
+    cmd = g.command(
+        ["ffmpeg", "-i", "in.mp4", "-filter_complex", "[0:a]anull[out]", "out.wav"],
+        "encode",
+    )
+    ffmpeg = cmd[cmd.index("ffmpeg") :]
+    assert ffmpeg[1:5] == ["-filter_threads", "4", "-filter_complex_threads", "4"]
+
+
+def test_available_cpus_respects_cgroup_v2_quota(tmp_path):
+    (tmp_path / "cpu.max").write_text("150000 100000\n")
+    assert available_cpus(str(tmp_path)) == min(2, len(os.sched_getaffinity(0)))
+
+
+def test_available_cpus_respects_cgroup_v1_quota(tmp_path):
+    (tmp_path / "cpu").mkdir()
+    (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("100000\n")
+    (tmp_path / "cpu" / "cpu.cfs_period_us").write_text("100000\n")
+    assert available_cpus(str(tmp_path)) == 1
+
+
+def test_available_cpus_without_quota_uses_affinity(tmp_path):
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    assert available_cpus(str(tmp_path)) == len(os.sched_getaffinity(0))
+
+
+def burn(seconds):
+    """Команда, которая тратит seconds CPU и печатает своё process_time."""
+    script = textwrap.dedent(
+        f"""
+        import time
+        while time.process_time() < {seconds}:
+            pass
+        print(time.process_time())
+        """
+    )
+    return [sys.executable, "-c", script]
+
+
+def test_cpu_usage_measures_child_cpu(tmp_path):
+    g = make_governor(tmp_path, max_jobs=1, cpus=2)
+    with cpu_usage() as u:
+        result = g.run(burn(0.3), "encode", check=True, capture_output=True, text=True)
+
+    reported = float(result.stdout)
+    # rusage включает ещё и запуск интерпретатора
+    assert reported >= 0.3
+    assert reported <= u.seconds < reported + 1.0
+
+
+def test_cpu_usage_nested_blocks_accumulate(tmp_path):
+    g = make_governor(tmp_path, max_jobs=1, cpus=2)
+    with cpu_usage() as outer:
+        g.run(burn(0.1), "encode", check=True)
+        with cpu_usage() as inner:
+            g.run(burn(0.2), "encode", check=True)
+        inner_only = inner.seconds
+
+    assert inner_only >= 0.2
+    assert outer.seconds >= inner_only + 0.1
+
+
+def test_cpu_usage_excludes_slot_wait(tmp_path):
+    g = make_governor(tmp_path, max_jobs=1, cpus=2)
+    usage = {}
+
+    def job():
+        with cpu_usage() as u:
+            g.run(burn(0.1), "encode", check=True)
+        usage["seconds"] = u.seconds
+        usage["finished"] = time.perf_counter()
+
+    with g.slot():
+        worker = threading.Thread(target=job)
+        worker.start()
+        time.sleep(0.5)
+        released = time.perf_counter()
+    worker.join(timeout=10)
+
+    # Задача ждала слот 0.5 с, но учтено только её собственное CPU-время
+    assert usage["finished"] >= released
+    assert 0.1 <= usage["seconds"] < 0.45
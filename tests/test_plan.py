@@ -0,0 +1,71 @@
+from pathlib import Path
+
+import pytest
+
+import src.plan as plan_module
+from src.plan import build_plan, schedule
+from src.timings import chain_rtf, load_timings
+
+
+def entries(*totals):
+    return [{"input": Path(f"{i}.mp4"), "total": t} for i, t in enumerate(totals)]
+
+
+@pytest.mark.parametrize(
+    "totals, jobs, makespan",
+    [
+        ((5, 4, 3, 3, 3), 1, 18),
+        # LPT: 5 | 4+3 | 3+3
+        ((5, 4, 3, 3, 3), 3, 7),
+        # LPT: 5+3 | 4+3+3
+        ((5, 4, 3, 3, 3), 2, 10),
+        # Воркеров больше, чем файлов: упирается в самый долгий файл
+        ((7, 2), 8, 7),
+        ((), 4, 0),
+    ],
+)
+def test_schedule_makespan(totals, jobs, makespan):
+    result, queues = schedule(entries(*totals), jobs)
+    assert result == makespan
+    assert len(queues) == jobs
+    assert sum(len(q) for q in queues) == len(totals)
+
+
+def test_schedule_treats_zero_jobs_as_one():
+    result, queues = schedule(entries(2, 3), 0)
+    assert result == 5
+    assert len(queues) == 1
+
+
+def test_build_plan_auto_chain(monkeypatch, tmp_path):
+    durations = {"a.mp4": 100.0}
+
+    def fake_duration(path):
+        if path.name not in durations:
+            raise RuntimeError("no such file")
+        return durations[path.name]
+
+    monkeypatch.setattr(plan_module, "get_duration", fake_duration)
+    table = load_timings(tmp_path / "missing.json")
+
+    plan = build_plan([Path("a.mp4"), Path("b.mp4")], {"auto_analyze": True}, table)
+
+    ok, failed = plan
+    assert ok["profile"] == "auto"
+    assert "afftdn" in ok["filters"]
+    assert set(ok["stages"]) == {"analyze", "encode", "validate"}
+    assert ok["stages"]["encode"] == pytest.approx(
+        chain_rtf(table, ok["filters"]) * 100.0
+    )
+    assert ok["total"] == pytest.approx(sum(ok["stages"].values()))
+    assert "error" in failed and failed["total"] == 0.0
+
+
+def test_build_plan_empty_manual_chain_uses_fallback(monkeypatch, tmp_path):
+    monkeypatch.setattr(plan_module, "get_duration", lambda path: 10.0)
+    table = load_timings(tmp_path / "missing.json")
+
+    (entry,) = build_plan([Path("a.mp4")], {"audio_filters": []}, table)
+
+    assert entry["profile"] == "fallback"
+    assert "analyze" not in entry["stages"]
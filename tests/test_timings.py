@@ -0,0 +1,105 @@
+import json
+
+import pytest
+
+from src.timings import (
+    DEFAULT_STAGE_RTF,
+    LEARNING_RATE,
+    chain_rtf,
+    estimate_job,
+    load_timings,
+    record_job,
+    update_timings,
+)
+
+CHAIN = ["highpass", "afftdn", "loudnorm"]
+
+
+@pytest.fixture
+def table(tmp_path):
+    return load_timings(tmp_path / "missing.json")
+
+
+def job(stages, filters=CHAIN, duration=100.0):
+    return {
+        "profile": "manual",
+        "filters": filters,
+        "duration": duration,
+        "stages": stages,
+    }
+
+
+def test_chain_rtf_sums_base_and_filters(table):
+    expected = (
+        table["stages"]["encode"]
+        + table["filters"]["highpass"]
+        + table["filters"]["afftdn"]
+        + table["filters"]["loudnorm"]
+    )
+    assert chain_rtf(table, CHAIN) == pytest.approx(expected)
+
+
+def test_estimate_uses_filter_sum_for_unknown_chain(table):
+    estimate = estimate_job(table, CHAIN, 1000.0, auto_analyze=True)
+    assert estimate["encode"] == pytest.approx(chain_rtf(table, CHAIN) * 1000.0)
+    assert estimate["analyze"] == pytest.approx(DEFAULT_STAGE_RTF["analyze"] * 1000.0)
+    assert "analyze" not in estimate_job(table, CHAIN, 1000.0, auto_analyze=False)
+
+
+def test_learned_chain_overrides_filter_sum(table):
+    update_timings(table, job({"encode": 50.0}))
+    assert estimate_job(table, CHAIN, 100.0, False)["encode"] == pytest.approx(50.0)
+
+
+def test_learned_chain_does_not_leak_to_other_chains(table):
+    update_timings(table, job({"encode": 50.0}, filters=["highpass"]))
+    other = estimate_job(table, CHAIN, 100.0, False)["encode"]
+    assert other == pytest.approx(chain_rtf(table, CHAIN) * 100.0)
+    assert other < 50.0
+
+
+def test_stage_rtf_is_blended(table):
+    update_timings(table, job({"analyze": 10.0, "validate": 5.0}))
+    old = DEFAULT_STAGE_RTF["analyze"]
+    assert table["stages"]["analyze"] == pytest.approx(
+        (1 - LEARNING_RATE) * old + LEARNING_RATE * 0.1
+    )
+    assert table["stages"]["validate"] == pytest.approx(
+        (1 - LEARNING_RATE) * DEFAULT_STAGE_RTF["validate"] + LEARNING_RATE * 0.05
+    )
+
+
+@pytest.mark.parametrize("stages", [{"encode": 0.0}, {"analyze": 0.0, "encode": 0.0}])
+def test_zero_measurement_is_ignored(table, stages):
+    before = json.loads(json.dumps(table))
+    update_timings(table, job(stages))
+    assert table == before
+    # Следующее обновление работает как обычно
+    update_timings(table, job({"encode": 5.0}))
+    assert table["stages"]["encode"] > 0
+
+
+def test_scale_is_clamped(table):
+    update_timings(table, job({"encode": 1e6}))
+    assert table["stages"]["encode"] == pytest.approx(DEFAULT_STAGE_RTF["encode"] * 2)
+
+
+@pytest.mark.parametrize(
+    "content",
+    ["{not json", "[]", '{"stages": {"encode": 0}, "profiles": {"x": {"encode": 0}}}'],
+)
+def test_bad_table_falls_back_to_defaults(tmp_path, content):
+    path = tmp_path / "timings.json"
+    path.write_text(content)
+    table = load_timings(path)
+    assert table["stages"] == DEFAULT_STAGE_RTF
+    assert table["profiles"] == {}
+
+
+def test_record_job_round_trip(tmp_path):
+    path = tmp_path / "timings.json"
+    record_job(path, job({"encode": 50.0}))
+    record_job(path, job({"encode": 50.0}))
+    learned = load_timings(path)["profiles"][",".join(CHAIN)]
+    assert learned["samples"] == 2
+    assert learned["encode"] == pytest.approx(0.5)
@@ -1,27 +1,148 @@
+import sys
+import threading
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+
 from src.config import load_config
-from src.cli import parse_args, resolve_paths
-from src.pipeline import process_file
+from src.cli import TIMINGS_FILE, parse_args, resolve_paths
+from src.governor import Governor, configure
+from src.pipeline import preview_file, process_file
+from src.plan import build_plan, print_plan
+from src.timings import load_timings, record_job
 
 
-def main():
-    args = parse_args()
-    in_path, out_path, cfg_path = resolve_paths(args)
-    cfg = load_config(cfg_path)
+class PrefixedOutput:
+    """
+    Обёртка над stdout для параллельной обработки: каждая строка,
+    напечатанная из задачи, помечается именем её файла.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def labelled(self, label, fn, *args):
+        """Вызывает fn(*args), помечая её вывод меткой label."""
+        self._local.label = label
+        self._local.pending = ""
+        try:
+            return fn(*args)
+        finally:
+            if self._local.pending:
+                self.write("\n")
+            self._local.label = None
+
+    def write(self, text):
+        label = getattr(self._local, "label", None)
+        with self._lock:
+            if label is None:
+                return self.stream.write(text)
+            *lines, self._local.pending = (self._local.pending + text).split("\n")
+            for line in lines:
+                self.stream.write(f"[{label}] {line}\n")
+        return len(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+def collect_jobs(in_path, out_path):
+    """Пары (вход, выход) для файла или папки."""
     if in_path.is_dir():
-        out_path.mkdir(parents=True, exist_ok=True)
+        jobs = []
         for f in in_path.iterdir():
             if not f.is_file():
                 continue
             if f.suffix.lower() not in {".mp4", ".mkv", ".mov"}:
                 continue
-            out_file = out_path / f.name
-            process_file(f, out_file, cfg)
-    else:
-        if out_path.is_dir():
-            out_file = out_path / in_path.name
+            jobs.append((f, out_path / f.name))
+        return jobs
+
+    if out_path.is_dir():
+        return [(in_path, out_path / in_path.name)]
+    return [(in_path, out_path)]
+
+
+def run_parallel(jobs, run, workers):
+    """
+    Выполняет run(in_file, out_file) для всех пар в workers потоков.
+
+    После первой ошибки ещё не начатые задачи отменяются, начатые
+    дорабатывают; затем печатаются все ошибки и поднимается первая.
+    """
+    output = PrefixedOutput(sys.stdout)
+    sys.stdout = output
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {}
+            for in_file, out_file in jobs:
+                future = pool.submit(
+                    output.labelled, in_file.name, run, in_file, out_file
+                )
+                futures[future] = in_file
+            _, pending = wait(futures, return_when=FIRST_EXCEPTION)
+            for future in pending:
+                future.cancel()
+    finally:
+        sys.stdout = output.stream
+
+    failures = [
+        (futures[f], f.exception())
+        for f in futures
+        if not f.cancelled() and f.exception()
+    ]
+    if not failures:
+        return
+
+    skipped = sum(f.cancelled() for f in futures)
+    print(f"\n✗ Ошибок: {len(failures)}, пропущено файлов: {skipped}")
+    for in_file, exc in failures:
+        print(f"  {in_file.name}: {exc}")
+    raise failures[0][1]
+
+
+def main():
+    args = parse_args()
+    in_path, out_path, cfg_path = resolve_paths(args)
+    cfg = load_config(cfg_path)
+    jobs = collect_jobs(in_path, out_path)
+
+    if args.plan:
+        plan = build_plan([f for f, _ in jobs], cfg, load_timings(TIMINGS_FILE))
+        host_jobs = Governor(max_jobs=args.host_jobs).max_jobs
+        print_plan(plan, args.jobs, host_jobs)
+        return
+
+    if in_path.is_dir():
+        out_path.mkdir(parents=True, exist_ok=True)
+
+    # Все процессы ffmpeg делят бюджет хоста с другими запусками утилиты
+    configure(max_jobs=args.host_jobs)
+
+    # Строки прогресса нескольких ffmpeg в одном терминале нечитаемы
+    progress = args.jobs == 1
+
+    def run(in_file, out_file):
+        if args.preview:
+            start, length = args.preview
+            preview_out = out_file.with_suffix(".preview.wav")
+            preview_file(in_file, preview_out, cfg, start, length, args.compare)
         else:
-            out_file = out_path
-        process_file(in_path, out_file, cfg)
+            job = process_file(in_file, out_file, cfg, progress=progress)
+            try:
+                record_job(TIMINGS_FILE, job)
+            except Exception as e:
+                # Файл уже обработан; сбой статистики не должен его провалить
+                print(f"  ⚠ Не удалось обновить {TIMINGS_FILE}: {e}")
+
+    if args.jobs == 1:
+        for in_file, out_file in jobs:
+            run(in_file, out_file)
+    else:
+        run_parallel(jobs, run, args.jobs)
 
 
 if __name__ == "__main__":